@@ -3,16 +3,18 @@
 ontologies such as BFO, OBI and IAO.
 """
 from rdflib import Graph, Literal, Namespace, RDF, RDFS
+from rdflib.plugins.stores.memory import SimpleMemory
 
 # Constant
 BFO = OBI = IAO = Namespace('http://purl.obolibrary.org/obo/')
 IEO = Namespace('http://www.isterre.fr/ieo/')
 
-def nom_graph() -> Graph:
+def build_nom_graph() -> Graph:
     """ Create the graph to represent the nomenclature data into the IEO
-    ontology.
+    ontology. The graph is only written once, so it uses the SimpleMemory
+    store which does not maintain the indexes needed by the queries.
     """
-    graph = Graph()
+    graph = Graph(store=SimpleMemory())
     # IAO types
     crid_sym = IAO.IAO_0000577
     crid = IAO.IAO_0000578
@@ -60,3 +62,17 @@ def nom_graph() -> Graph:
     graph.add((product_reg, RDFS.subClassOf, crid_reg))
     graph.add((reg_version, RDFS.subClassOf, crid_sym))
     return graph
+
+
+# Template built once at import time and copied by nom_graph
+NOM_TEMPLATE = build_nom_graph()
+
+
+def nom_graph() -> Graph:
+    """ Return a new graph containing the nomenclature types. The triples
+    are copied from the template, so the callers can update the graph
+    without modifying the template.
+    """
+    graph = Graph(store=SimpleMemory())
+    graph.addN((s, p, o, graph) for s, p, o in NOM_TEMPLATE)
+    return graph
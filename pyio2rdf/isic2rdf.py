@@ -13,10 +13,19 @@ The package is compatible with the IEO ontology[1].
 
 """
 import argparse
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from os import cpu_count
 from os.path import splitext, abspath
-from rdflib import Graph, Literal, Namespace, RDF, RDFS
-from pandas import read_csv, DataFrame
-from ieo_types import nom_graph
+from typing import Iterable, Mapping
+from xml.sax.saxutils import escape, quoteattr
+from rdflib import BNode, Graph, Literal, Namespace, RDF, RDFS, URIRef
+from rdflib.namespace import split_uri
+from pandas import read_csv
+from ieo_types import nom_graph, NOM_TEMPLATE
 
 
 ISIC = Namespace('https://unstats.un.org/unsd/cr/registry/')
@@ -30,84 +39,258 @@ REGISTRY_VERSION = IEO.IEO_0000043
 REF_ACTIVITY = IEO.IEO_0000065
 ACTITIVY_CRID = IEO.IEO_0000066
 STAT_REGISTRY = IEO.IEO_0000071
+# Registry triples that do not depend on the classification version
+CRID_REG = 'ISIC'
+CRID_REG_LABEL = 'International Standard Industrial Classification'
+HEADER_TRIPLES = (
+    (STAT_REGISTRY, RDFS.label,
+     Literal('statistical classification registry', lang='en')),
+    (ISIC[CRID_REG], RDF.type, STAT_REGISTRY),
+    (ISIC[CRID_REG], RDFS.label, Literal(CRID_REG_LABEL)),
+    (IAO.denotes, RDFS.label, Literal('denotes', lang='en')))
+ISIC_STR = str(ISIC)
+# Minimum number of rows per shard formatted by a separate process
+MIN_SHARD_ROWS = 20000
+# Byte fragments of the N-Triples lines written for each row
+NT_ISIC = f'<{ISIC_STR}'.encode()
+NT_TYPE_SECTOR = f' {RDF.type.n3()} {ISIC.industrial_sector.n3()} .\n'.encode()
+NT_TYPE_CLASSIFICATION = f' {RDF.type.n3()} {ISIC.classification.n3()} .\n'.encode()
+NT_LABEL = f' {RDFS.label.n3()} "'.encode()
+NT_LANG_EN = b'"@en .\n'
+NT_HAS_PART = f' {BFO.has_part.n3()} '.encode()
+NT_PART_OF = f' {BFO.part_of.n3()} '.encode()
+NT_END = b' .\n'
+# Prefixes declared in the header of the RDF/XML output
+XML_PREFIXES = {'rdf': str(RDF), 'rdfs': str(RDFS), 'obo': str(BFO),
+                'ieo': str(IEO), 'isic': ISIC_STR}
+# Escape sequences of the N-Triples literals
+NT_ESCAPE_TABLE = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n',
+                                 '\r': '\\r'})
+# Characters replaced or removed to build the identifiers from the labels
+SPE_CHARACT = "\\`* >#+-.!$'"
+BRACKETS = '{}[]()'
+SPE_CHARACT_TABLE = str.maketrans({**{char: '_' for char in SPE_CHARACT},
+                                   **{char: None for char in BRACKETS}})
+SPE_CHARACT_RE = re.compile(f'[{re.escape(SPE_CHARACT+BRACKETS)}]')
 
 
+@lru_cache(maxsize=None)
 def sup_spe_charact(text: str):
-    for char in ['\\','`','*',' ','>','#','+','-','.','!','$','\'']:
-        if char in text:
-            text = text.replace(char, "_")
-        elif char in ['{','}','[',']','(',')']:
-            text = text.replace(char, "")
-    return text
+    """ Replace the special characters by '_' and remove the brackets. The
+    results are cached since the same labels come back in the classification.
+    """
+    if not SPE_CHARACT_RE.search(text):
+        return sys.intern(text)
+    return sys.intern(text.translate(SPE_CHARACT_TABLE))
+
+
+def isic_uri(value: str) -> URIRef:
+    """ Return the URI of an ISIC identifier built on an interned string."""
+    return URIRef(sys.intern(ISIC_STR+value))
+
+
+def lit_en(text: str, cls=Literal) -> Literal:
+    """ Return the english Literal of a label. The labels are plain strings,
+    so the validation and the casting done by Literal.__new__ are skipped."""
+    literal = str.__new__(cls, text)
+    literal._language = 'en'
+    literal._datatype = None
+    literal._value = text
+    literal._ill_typed = None
+    return literal
 
 
 def verify_version() -> int:
-    try:
-        version_number = int(input('What is the version number of the ISIC Rev classification? :'))
-    except:
-        print('The version has to be an integer')
-        version_number = verify_version()
-    return version_number
+    """ Ask the version number until the answer is an integer."""
+    while True:
+        try:
+            return int(input('What is the version number of the ISIC Rev classification? :'))
+        except ValueError:
+            print('The version has to be an integer')
 
 
-def isic2crid(data: DataFrame) -> Graph:
-    graph = nom_graph()
-    crid_reg = 'ISIC'
-    crid_reg_label = 'International Standard Industrial Classification'
-    version = str(verify_version())
-    graph.add((STAT_REGISTRY, RDFS.label,
-               Literal('statistical classification registry', lang='en')))
-    graph.add((ISIC[crid_reg], RDF.type, STAT_REGISTRY))
-    graph.add((ISIC[crid_reg], RDFS.label, Literal(crid_reg_label)))
+def registry_triples(version: str) -> list:
+    """ Return the triples describing the registry and its version."""
     database_id = 'ISIC_Rev'+version
     database_label = 'International Standard Industrial Classification (ISIC) Rev'+version
-    graph.add((REGISTRY_VERSION, RDFS.label,
-               Literal('registry version', lang='en')))
-    graph.add((ISIC[database_id], RDF.type, REGISTRY_VERSION))
-    graph.add((ISIC[database_id], RDFS.label,
-               Literal(database_label)))
-    graph.add((ISIC[database_id], IAO.denotes, ISIC[crid_reg]))
-    graph.add((IAO.denotes, RDFS.label,
-               Literal('denotes', lang='en')))
     classification_label = f'ISIC Rev{version} identifier'
-    graph.add((ISIC.classification, RDFS.label, Literal(classification_label, lang='en')))
-    graph.add((ISIC.classification, RDFS.subClassOf, ACTITIVY_CRID))
     ind_sector_label = classification_label+' label'
-    graph.add((ISIC.industrial_sector, RDFS.subClassOf, REF_ACTIVITY))
-    graph.add((ISIC.industrial_sector, RDFS.label, Literal(ind_sector_label, lang='en')))
-    for code in data.index:
-        activity_label = data.loc[code][0]
+    db_uri = isic_uri(database_id)
+    return [*HEADER_TRIPLES,
+            (db_uri, RDF.type, REGISTRY_VERSION),
+            (db_uri, RDFS.label, Literal(database_label)),
+            (db_uri, IAO.denotes, ISIC[CRID_REG]),
+            (ISIC.classification, RDFS.label,
+             Literal(classification_label, lang='en')),
+            (ISIC.classification, RDFS.subClassOf, ACTITIVY_CRID),
+            (ISIC.industrial_sector, RDFS.subClassOf, REF_ACTIVITY),
+            (ISIC.industrial_sector, RDFS.label,
+             Literal(ind_sector_label, lang='en'))]
+
+
+def isic2crid(data: Mapping[str, str], version: int = None) -> Graph:
+    """ Transform the ISIC classification into a RDF graph. The triples are
+    accumulated and inserted in the graph with a single addN call. The
+    version number is asked if it is not given."""
+    graph = nom_graph()
+    if version is None:
+        version = verify_version()
+    version = str(version)
+    database_id = 'ISIC_Rev'+version
+    # Terms shared by every row
+    rdf_type = RDF.type
+    rdfs_label = RDFS.label
+    has_part = BFO.has_part
+    part_of = BFO.part_of
+    db_uri = isic_uri(database_id)
+    classification = ISIC.classification
+    ind_sector = ISIC.industrial_sector
+    quads = [(s, p, o, graph) for s, p, o in registry_triples(version)]
+    for code, activity_label in data.items():
         crid = f'{database_id}_{code}'
         crid_label = f'{database_id}:{code} {activity_label}'
-        activity_id = sup_spe_charact(activity_label)
-        graph.add((ISIC[activity_id], RDF.type, ISIC.industrial_sector))
-        graph.add((ISIC[activity_id], RDFS.label, Literal(activity_label, lang='en')))
-        graph.add((ISIC[crid], RDFS.label, Literal(crid_label, lang='en')))
-        graph.add((ISIC[crid], RDF.type, ISIC.classification))
-        graph.add((ISIC[crid], RDFS.label, Literal(crid_label, lang='en')))
-        graph.add((ISIC[crid], BFO.has_part, ISIC[database_id]))
-        graph.add((ISIC[database_id], BFO.part_of, ISIC[crid]))
-        graph.add((ISIC[crid], BFO.has_part, ISIC[activity_id]))
-        graph.add((ISIC[activity_id], BFO.part_of, ISIC[crid]))
+        activity_uri = isic_uri(sup_spe_charact(activity_label))
+        crid_uri = isic_uri(crid)
+        activity_lit = lit_en(activity_label)
+        crid_lit = lit_en(crid_label)
+        quads.extend([
+            (activity_uri, rdf_type, ind_sector, graph),
+            (activity_uri, rdfs_label, activity_lit, graph),
+            (crid_uri, rdfs_label, crid_lit, graph),
+            (crid_uri, rdf_type, classification, graph),
+            (crid_uri, has_part, db_uri, graph),
+            (db_uri, part_of, crid_uri, graph),
+            (crid_uri, has_part, activity_uri, graph),
+            (activity_uri, part_of, crid_uri, graph)])
+    graph.addN(quads)
     return graph
 
 
+def nt_escape(text: str) -> str:
+    """ Escape a string to be written as a N-Triples literal."""
+    return text.translate(NT_ESCAPE_TABLE)
+
+
+def format_shard(database_id: str, rows: list) -> bytes:
+    """ Format a shard of the classification rows as N-Triples. The lines
+    are assembled from the constant byte fragments and joined only once."""
+    db_uri = f'<{ISIC_STR}{database_id}>'.encode()
+    crid_prefix = f'<{ISIC_STR}{database_id}_'.encode()
+    crid_label_prefix = f'{database_id}:'.encode()
+    parts = []
+    for code, activity_label in rows:
+        activity_uri = NT_ISIC+sup_spe_charact(activity_label).encode()+b'>'
+        crid_uri = crid_prefix+code.encode()+b'>'
+        label = nt_escape(activity_label).encode()
+        parts.extend((
+            activity_uri, NT_TYPE_SECTOR,
+            activity_uri, NT_LABEL, label, NT_LANG_EN,
+            crid_uri, NT_LABEL, crid_label_prefix, nt_escape(code).encode(),
+            b' ', label, NT_LANG_EN,
+            crid_uri, NT_TYPE_CLASSIFICATION,
+            crid_uri, NT_HAS_PART, db_uri, NT_END,
+            db_uri, NT_PART_OF, crid_uri, NT_END,
+            crid_uri, NT_HAS_PART, activity_uri, NT_END,
+            activity_uri, NT_PART_OF, crid_uri, NT_END))
+    return b''.join(parts)
+
+
+def isic2nt_stream(data: Mapping[str, str], out_path: str,
+                   version: int = None, min_shard_rows: int = MIN_SHARD_ROWS):
+    """ Write the ISIC classification directly as N-Triples.
+
+    It produces the same triples as isic2crid but writes them into the
+    output file without building an in-memory graph. Large classifications
+    are split in shards of at least min_shard_rows rows, one per CPU at most,
+    formatted by a pool of processes. Smaller ones are formatted inline.
+    """
+    if version is None:
+        version = verify_version()
+    version = str(version)
+    database_id = 'ISIC_Rev'+version
+    rows = list(data.items())
+    nb_shards = min(cpu_count() or 1, len(rows) // min_shard_rows)
+    with open(out_path, 'wb', buffering=1 << 20) as out:
+        for s, p, o in (*NOM_TEMPLATE, *registry_triples(version)):
+            out.write(f'{s.n3()} {p.n3()} {o.n3()} .\n'.encode('utf-8'))
+        if nb_shards <= 1:
+            # starting the pool costs more than formatting a small shard
+            out.write(format_shard(database_id, rows))
+        else:
+            size = -(-len(rows) // nb_shards)
+            shards = [rows[i:i+size] for i in range(0, len(rows), size)]
+            with ProcessPoolExecutor(max_workers=nb_shards) as pool:
+                for buffer in pool.map(format_shard, repeat(database_id),
+                                       shards):
+                    out.write(buffer)
+
+
+def xml_node(term, attribute: str) -> str:
+    """ Return the XML attribute referencing a resource or a blank node."""
+    if isinstance(term, BNode):
+        return f'rdf:nodeID={quoteattr(str(term))}'
+    return f'rdf:{attribute}={quoteattr(str(term))}'
+
+
+def serialize_xml_fast(triples: Iterable, out_path: str, prefixes: dict):
+    """ Write the triples as RDF/XML.
+
+    The triples are grouped by subject and written as flat rdf:Description
+    blocks. The prefixes are declared once in the header and the qualified
+    name of each predicate is resolved only once.
+    Variables:
+    - triples: iterable of (subject, predicate, object), e.g. a Graph
+    - out_path: path of the output file
+    - prefixes: dictionary of the prefixes and their namespace
+    """
+    prefix_of = {namespace: prefix for prefix, namespace in prefixes.items()}
+    prefix_of.setdefault(str(RDF), 'rdf')
+    qnames = {}
+    subjects = {}
+    for s, p, o in triples:
+        if p not in qnames:
+            namespace, local_name = split_uri(p)
+            if namespace not in prefix_of:
+                prefix_of[namespace] = f'ns{len(prefix_of)}'
+            qnames[p] = f'{prefix_of[namespace]}:{local_name}'
+        subjects.setdefault(s, []).append((qnames[p], o))
+    with open(out_path, 'w', encoding='utf-8', buffering=1 << 20) as out:
+        out.write('<?xml version="1.0" encoding="utf-8"?>\n<rdf:RDF\n')
+        for namespace, prefix in prefix_of.items():
+            out.write(f'   xmlns:{prefix}={quoteattr(namespace)}\n')
+        out.write('>\n')
+        for s, properties in subjects.items():
+            out.write(f'  <rdf:Description {xml_node(s, "about")}>\n')
+            for qname, o in properties:
+                if not isinstance(o, Literal):
+                    out.write(f'    <{qname} {xml_node(o, "resource")}/>\n')
+                    continue
+                if o.language:
+                    attribute = f' xml:lang={quoteattr(o.language)}'
+                elif o.datatype:
+                    attribute = f' rdf:datatype={quoteattr(o.datatype)}'
+                else:
+                    attribute = ''
+                out.write(f'    <{qname}{attribute}>{escape(o)}</{qname}>\n')
+            out.write('  </rdf:Description>\n')
+        out.write('</rdf:RDF>\n')
+
+
 def avoid_overwrite(output_path: str) -> str:
     """ The function prevents the overwriting of the source file by the
     output."""
     message = """" The path for the output and the input file is the same.
     The input file is going to be overwritten. Are you sure to overwrite
     the input file? (Yes/No): """
-    answer = input(message).lower()
-    if answer in ['yes', 'y']:
-        return output_path
-    elif answer in ('no', 'n'):
-        message = " What is the new path? (absolute or relative path): "
-        new_path = input(message)
-        return new_path
-    else:
+    while True:
+        answer = input(message).lower()
+        if answer in ['yes', 'y']:
+            return output_path
+        elif answer in ('no', 'n'):
+            message = " What is the new path? (absolute or relative path): "
+            new_path = input(message)
+            return new_path
         print('Error. The expected answer is Yes or No.')
-        return avoid_overwrite(output_path)
 
 
 def main():
@@ -125,7 +308,8 @@ def main():
 
     Options:
     -output, -o path of the output file
-    --format, -f format of the output"""
+    --format, -f format of the output
+    --version, -v version number of the ISIC Rev classification"""
     # create the parser
     parser = argparse.ArgumentParser(
         description=description,
@@ -133,9 +317,15 @@ def main():
     parser.add_argument(
         "--format", '-f',
         nargs=1,
-        choices=['json-ld', 'xml', 'n3', 'nt'],
+        choices=['json-ld', 'xml', 'pretty-xml', 'n3', 'nt'],
         default=['xml'],
         help='the output format of the file (default: Xml)')
+    parser.add_argument(
+        "--version", '-v',
+        type=int,
+        default=None,
+        help='the version number of the ISIC Rev classification '\
+             '(default: asked)')
     parser.add_argument(
         "input_path",
         metavar='path_to_input_file',
@@ -152,23 +342,32 @@ def main():
     args = parser.parse_args()
     input_path = args.input_path[0]
     try:
-        data = read_csv(input_path, index_col=0)
+        data = read_csv(input_path, index_col=0, usecols=[0, 1], dtype=str,
+                        engine='c', na_filter=False).iloc[:, 0].to_dict()
     except:
         raise('Error in the input file. Impossible to open it. '\
               'The format expected is [code][label]')
-    graph = isic2crid(data)
     if not args.output_path:
         path = abspath(args.input_path[0])
         name_file = splitext(path)[0]
-        new_ext = {'json-ld': '.json', 'xml': '.rdf', 'n3': '.n3',
-                   'nt': '.nt'}
+        new_ext = {'json-ld': '.json', 'xml': '.rdf', 'pretty-xml': '.rdf',
+                   'n3': '.n3', 'nt': '.nt'}
         new_ext = new_ext[args.format[0]]
         output_path = name_file+new_ext
     else:
         output_path = args.output_path
-    if input_path == output_path:
+    if abspath(input_path) == abspath(output_path):
         output_path = avoid_overwrite(output_path)
-    graph.serialize(output_path, format=args.format[0])
+    # N-Triples is a subset of N3, both are written without the graph
+    if args.format[0] in ('nt', 'n3'):
+        isic2nt_stream(data, output_path, args.version)
+    elif args.format[0] == 'xml':
+        graph = isic2crid(data, args.version)
+        serialize_xml_fast(graph, output_path, XML_PREFIXES)
+    else:
+        graph = isic2crid(data, args.version)
+        graph.serialize(destination=output_path, format=args.format[0],
+                        encoding='utf-8')
 
 
 if __name__ == "__main__":
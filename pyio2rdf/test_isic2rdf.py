@@ -0,0 +1,35 @@
+from rdflib import Graph
+import isic2rdf
+
+
+DATA = {'A': 'Agriculture, forestry and fishing',
+        '01': 'Crop and animal production, hunting and related service '
+              'activities',
+        '011': 'Growing of non-perennial crops',
+        'B': 'Mining and quarrying',
+        '05': 'Mining of coal and lignite'}
+
+
+def parse_nt(path) -> set:
+    graph = Graph()
+    graph.parse(path, format='nt')
+    return set(graph)
+
+
+def test_isic2nt_stream_pool_matches_inline(tmp_path, monkeypatch):
+    """ The shards formatted by the pool give the same triples as the
+    inline formatting."""
+    inline_path = tmp_path/'inline.nt'
+    pool_path = tmp_path/'pool.nt'
+    isic2rdf.isic2nt_stream(DATA, inline_path, 4)
+    monkeypatch.setattr(isic2rdf, 'cpu_count', lambda: 2)
+    isic2rdf.isic2nt_stream(DATA, pool_path, 4, min_shard_rows=1)
+    assert parse_nt(pool_path) == parse_nt(inline_path)
+    assert parse_nt(inline_path) == set(isic2rdf.isic2crid(DATA, 4))
+
+
+def test_isic2nt_stream_empty(tmp_path):
+    """ A classification without rows only writes the header triples."""
+    path = tmp_path/'empty.nt'
+    isic2rdf.isic2nt_stream({}, path, 4)
+    assert parse_nt(path) == set(isic2rdf.isic2crid({}, 4))
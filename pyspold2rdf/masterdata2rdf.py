@@ -11,11 +11,19 @@ The package is compatible with the IEO ontology[1].
 
 """
 import argparse
-import xml.etree.ElementTree as Xml
-from os.path import splitext, abspath
-from rdflib import Graph, Literal, Namespace, RDF, RDFS, OWL
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain, repeat
+from types import MappingProxyType
+from typing import Iterable, Iterator, Mapping
+from os import cpu_count
+from os.path import splitext, abspath, exists
+from lxml import etree
+from rdflib import Graph, Literal, Namespace, RDF, RDFS, OWL, URIRef
 from unit import ecoinvent_units
-from ieo_types import nom_graph
+from ieo_types import nom_graph, NOM_TEMPLATE
 
 
 # Constant
@@ -25,6 +33,9 @@ registries={'http://www.EcoInvent.org/EcoSpold02':
 BFO = OBI = IAO = Namespace('http://purl.obolibrary.org/obo/')
 IEO = Namespace('http://www.isterre.fr/ieo/')
 ECO = Namespace('http://www.EcoInvent.org/EcoSpold02'.lower() + '#')
+ECO_STR = str(ECO)
+XML_NS = 'http://www.w3.org/XML/1998/namespace'
+LANG_KEY = f'{{{XML_NS}}}lang'
 SERVICE = OBI.OBI_0001173
 MATERIAL_ENTITY = BFO.BFO_0000040
 IAO.denotes = IAO.IAO_0000219
@@ -38,322 +49,419 @@ ACT_REGISTRY = IEO.IEO_0000067
 REF_PRODUCT = IEO.IEO_0000068
 PROD_CRID = IEO.IEO_0000069
 PROD_REGISTRY = IEO.IEO_0000070
+TO_SORT = IEO.to_sort
+# Terms shared by every element
+RDF_TYPE = RDF.type
+RDFS_LABEL = RDFS.label
+HAS_PART = BFO.has_part
+DENOTES = IAO.denotes
+ACT_ID = ECO.activityId
+ACT_NAME = ECO.activity_name
+INTER_ID = ECO.interm_exch_Id
+INTER_NAME = ECO.interm_exch_name
+ELEM_ID = ECO.elementary_exchange_id
+ELEM_NAME = ECO.elem_exch_name
+# Labels of the reused types and relations
+SCHEMA_TRIPLES = (
+    (IAO.denotes, RDFS.label, Literal('denotes', lang='en')),
+    (MATERIAL_ENTITY, RDFS.label, Literal('material entity', lang='en')),
+    (SERVICE, RDFS.label, Literal('service', lang='en')),
+    (BFO.has_part, RDFS.label, Literal('has part', lang='en')),
+    (BFO.part_of, RDFS.label, Literal('part of', lang='en')),
+    # the part of relations are left to the reasoners
+    (BFO.has_part, OWL.inverseOf, BFO.part_of))
+TO_SORT_COMMENT = """Some product cannot be automatically defined as a good (material entity) or a service by the masterdata2rdf.py script. In this case, the product is defined as a product to sort. It's a temporary class that should not existed. Once the instance of this class are sorted, the product to sort class should be suppressed.
+    """
+TO_SORT_TRIPLES = (
+    (TO_SORT, RDFS.label, Literal('product to sort', lang='en')),
+    (TO_SORT, RDFS.comment, Literal(TO_SORT_COMMENT, lang='en')))
+# Characters escaped in the N-Triples literals
+NT_ESCAPE_TABLE = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n',
+                                 '\r': '\\r'})
+# Type of the product denoted by an exchange, by unit
+GOOD_UNIT_TYPES = dict.fromkeys(ecoinvent_units['good'], MATERIAL_ENTITY)
+UNIT_TYPES = {**GOOD_UNIT_TYPES,
+              **dict.fromkeys(ecoinvent_units['service'], SERVICE)}
+# Classes of each nomenclature
+ACT_CLASSES = (
+    (ACT_ID, RDFS.subClassOf, ACT_CRID),
+    (ACT_ID, RDFS.label, Literal('EcoInvent activity identifier', lang='en')),
+    (ACT_NAME, RDFS.subClassOf, REF_ACTIVITY),
+    (ACT_NAME, RDFS.label, Literal('EcoInvent activity label', lang='en')))
+INTER_CLASSES = (
+    (INTER_ID, RDFS.subClassOf, PROD_CRID),
+    (INTER_ID, RDFS.label,
+     Literal('EcoInvent intermediary exchange identifier', lang='en')),
+    (INTER_NAME, RDFS.subClassOf, REF_PRODUCT),
+    (INTER_NAME, RDFS.label,
+     Literal('EcoInvent intermediary exchange label', lang='en')),
+    *TO_SORT_TRIPLES)
+ELEM_CLASSES = (
+    (ELEM_ID, RDFS.subClassOf, PROD_CRID),
+    (ELEM_ID, RDFS.label,
+     Literal('EcoInvent elementary exchange identifier', lang='en')),
+    (ELEM_NAME, RDFS.subClassOf, REF_PRODUCT),
+    (ELEM_NAME, RDFS.label,
+     Literal('EcoInvent elementary exchange label', lang='en')),
+    *TO_SORT_TRIPLES)
 
 
-def define_registry(func):
-    """Define the type and the label of the database version and the registry.
-    """
-    def func_wrapper(graph: Graph, xml_root: Xml, registry: dict,
-                     namespaces: dict, tag: str):
-        # crid_reg: CRID registry, e.g Ecoinvent
-        crid_reg = registry['reg_id']
-        crid_reg_label = registry['label']
-        graph.add((ECO[crid_reg], RDF.type, LCA_REGISTRY))
-        # Database identifier, e.g. EcoInvent3.1
-        major_release = xml_root.attrib['majorRelease']
-        minor_release = xml_root.attrib['minorRelease']
-        database_version = f'v{major_release}_{minor_release}'
-        database_id = crid_reg+database_version
-        database_label = crid_reg_label+f'v{major_release}.{minor_release}'
-        graph.add((ECO[database_id], RDF.type, REGISTRY_VERSION))
-        graph.add((ECO[database_id], RDFS.label,
-                   Literal(database_label)))
-        graph.add((ECO[database_id], IAO.denotes, ECO[crid_reg]))
-        graph.add((IAO.denotes, RDFS.label,
-                   Literal('denotes', lang='en')))
-        graph.add((BFO.BFO_0000040, RDFS.label,
-                   Literal('material entity', lang='en')))
-        graph.add((ECO[database_id], RDFS.label,
-                   Literal(database_label)))
-        graph.add((OBI.OBI_0001173, RDFS.label,
-                   Literal('service', lang='en')))
-        graph.add((BFO.has_part, RDFS.label,
-                   Literal('has part', lang='en')))
-        graph.add((BFO.part_of, RDFS.label,
-                   Literal('part of', lang='en')))
-        graph = func(graph, xml_root, registry, namespaces, tag)
-        return graph
-    return func_wrapper
-
-
-@define_registry
-def act2graph(graph: Graph, xml_root: Xml, registry: dict,
-              namespaces: dict, tag: str) -> Graph:
-    """ Transform activityName tag into RDF graph.
-
-    The function transforms the Activity MasterData into identifier. The output
-    is a RDF graph that represents a part of the Ecoinvent nomenclature
-    structured with The IEO ontology. The output represents the centrally
-    registrered identifier (CRID) by the database version and the activity name
-    identifier, e.g. ecoinvent3.0:88d6c0aa-0053-4367-b0be-05e4b49ff3c5 for the
-    copper production, primary.
-    Variables:
-    - graph: the graph to update
-    - xml_root: the root of the xml file
-    - registry: dictionary containing the reference/info of the data registry
-    - tag: string containing the namespace tag
-    - namespaces: dictionary containing the namespaces with tags
-    """
-    # crid_reg: CRID registry, e.g Ecoinvent
-    crid_reg = registry['reg_id']
-    crid_reg_label = registry['label']
-    # Database identifier, e.g. EcoInvent3.1
-    major_release = xml_root.attrib['majorRelease']
-    minor_release = xml_root.attrib['minorRelease']
-    database_version = f'v{major_release}_{minor_release}'
-    database_label = f'{crid_reg_label}{major_release}.{minor_release}'
-    database_id = crid_reg+database_version
-    graph.add((ECO[crid_reg], RDFS.label, Literal(crid_reg_label, lang='en')))
-    graph.add((ECO.activityId, RDFS.subClassOf, ACT_CRID))
-    activity_id_label = 'EcoInvent activity identifier'
-    graph.add((ECO.activityId, RDFS.label, Literal(activity_id_label, lang='en')))
-    graph.add((ECO.activity_name, RDFS.subClassOf, REF_ACTIVITY))
-    activity_label = 'EcoInvent activity label'
-    graph.add((ECO.activity_name, RDFS.label, Literal(activity_label, lang='en')))
-    for activity_name in xml_root.findall(tag, namespaces):
-        activity_name_id = activity_name.attrib['id']
-        crid = activity_name_id+database_version
-        graph.add((ECO[crid], RDF.type, ECO.activityId))
-        graph.add((ECO[activity_name_id], RDF.type, ECO.activity_name))
-        # Define the property relation between the symbols of the CRID
-        graph.add((ECO[crid], BFO.has_part, ECO[database_id]))
-        graph.add((ECO[database_id], BFO.part_of, ECO[crid]))
-        graph.add((ECO[crid], BFO.has_part, ECO[activity_name_id]))
-        graph.add((ECO[activity_name_id], BFO.part_of, ECO[crid]))
-        # Define the labels with the different languages
-        xml_ns = namespaces['xml']
-        for name in activity_name.findall('eco:name', namespaces):
-            lang = name.attrib['{'+xml_ns+'}lang']
-            activity_label = name.text
-            crid_label = f'{database_label}:{activity_label}'
-            graph.add((ECO[crid], RDFS.label, Literal(crid_label, lang=lang)))
-            graph.add((ECO[activity_name_id],
-                       RDFS.label,
-                       Literal(activity_label, lang=lang)))
+class RegistryUnknownError(LookupError):
+    """ The namespace of the MasterData file matches no known registry."""
+
+
+@lru_cache(maxsize=None)
+def masterdata_paths(eco_ns: str) -> dict:
+    """ Return the tags and paths (Clark notation) used to read the children
+    of the MasterData elements of the given namespace. They are built once
+    per namespace instead of being parsed at each lookup."""
+    return {
+        'name': f'{{{eco_ns}}}name',
+        'property': f'{{{eco_ns}}}property',
+        'unit_name': f'{{{eco_ns}}}unitName',
+        'compartment': f'{{{eco_ns}}}compartment/{{{eco_ns}}}compartment',
+        'subcompartment': f'{{{eco_ns}}}compartment/{{{eco_ns}}}subcompartment'}
+
+
+def ensure_schema(graph: Graph) -> Graph:
+    """ Add the labels of the reused types and relations to the graph. They
+    are added once per graph whatever the number of nomenclatures."""
+    if not getattr(graph, 'ieo_schema', False):
+        graph.addN((s, p, o, graph) for s, p, o in SCHEMA_TRIPLES)
+        graph.ieo_schema = True
     return graph
 
 
-@define_registry
-def inter2graph(graph: Graph, xml_root: Xml,
-                registry: dict, namespaces: dict, tag: str) -> Graph:
-    """Transform intermediateExchange tag into RDF graph.
-
-    The function transforms the IntermediateExchange MasterData into identifier.
-    The output is a RDF graph that represents a part of the Ecoinvent
-    nomenclature structured with the IEO ontology. The output represents the
-    centrally registrered identifier (CRID) by the database version and the
-    intermediate name identifier,
-    e.g. ecoinvent3.0:fbb039f7-f9cc-46d2-b631-313ddb125c1a for the copper.
-    TODO: link the intermediary exchange nomenclature to the material products
-    and its property. In reality, the intermediary exchange name denotes a
-    product that has some quality (properties). It's wrong to link direclty
-    the nomenclature to the property.
-    Variables:
-    - graph: the graph to update
-    - xml_root: the root of the xml file
-    - registry: dictionary containing the reference/info of the data registry
-    - tag: string containing the namespace tag
-    - namespaces: dictionary containing the namespaces with tags
-    """
+@lru_cache(maxsize=8192)
+def lang_literal(text: str, lang: str) -> Literal:
+    """ Return the literal of a label in the given language. The same names
+    recur across the MasterData elements, so their literals are shared."""
+    return Literal(text, lang=lang)
+
+
+@dataclass(frozen=True, slots=True)
+class RegistryContext:
+    """ Values shared by all the elements of a MasterData file. They are
+    built once per file; the namespaces and paths are read-only views."""
+    # CRID registry, e.g Ecoinvent
+    crid_reg_label: str
+    crid_reg_uri: URIRef
+    # Database version, e.g. v3_1, and its labels
+    database_version: str
+    version_label: str
+    # Prefix of the CRID labels, e.g. EcoInvent3.1:
+    crid_label_prefix: str
+    db_uri: URIRef
+    namespaces: Mapping
+    paths: Mapping
+
+
+def registry_context(xml_root: etree._Element, registry: dict,
+                     namespaces: dict) -> RegistryContext:
+    """ Return the values shared by all the elements of the MasterData file:
+    the registry, the database version and its label, the namespaces and the
+    paths of the children. They are computed once per file."""
+    # crid_reg: CRID registry identifier
     crid_reg = registry['reg_id']
-    crid_reg_label = registry['label']
-    # Database identifier, e.g. EcoInvent3.1
     major_release = xml_root.attrib['majorRelease']
     minor_release = xml_root.attrib['minorRelease']
     database_version = f'v{major_release}_{minor_release}'
-    database_label = f'{crid_reg_label}{major_release}.{minor_release}'
-    database_id = crid_reg+database_version
-    graph.add((ECO[crid_reg], RDFS.label, Literal(crid_reg_label, lang='en')))
-    graph.add((ECO.interm_exch_Id, RDFS.subClassOf, PROD_CRID))
-    int_exch_id_label = 'EcoInvent intermediary exchange identifier'
-    graph.add((ECO.interm_exch_Id, RDFS.label, Literal(int_exch_id_label, lang='en')))
-    graph.add((ECO.interm_exch_name, RDFS.subClassOf, REF_PRODUCT))
-    int_exch_label = 'EcoInvent intermediary exchange label'
-    graph.add((ECO.interm_exch_name, RDFS.label, Literal(int_exch_label, lang='en')))
-    graph.add((IEO.to_sort, RDFS.label, Literal('product to sort', lang='en')))
-    to_sort_comment = """Some product cannot be automatically defined as a good (material entity) or a service by the masterdata2rdf.py script. In this case, the product is defined as a product to sort. It's a temporary class that should not existed. Once the instance of this class are sorted, the product to sort class should be suppressed.
+    return RegistryContext(
+        crid_reg_label=registry['label'],
+        crid_reg_uri=ECO[crid_reg],
+        database_version=database_version,
+        version_label=f"{registry['label']}v{major_release}.{minor_release}",
+        crid_label_prefix=(f"{registry['label']}{major_release}."
+                           f"{minor_release}:"),
+        db_uri=ECO[crid_reg+database_version],
+        namespaces=MappingProxyType(dict(namespaces)),
+        # the paths are cached per namespace and shared between the files
+        paths=MappingProxyType(masterdata_paths(namespaces['eco'])))
+
+
+def registry_triples(context: RegistryContext) -> list:
+    """Define the type and the label of the database version and the registry.
     """
-    graph.add((IEO.to_sort, RDFS.comment, Literal(to_sort_comment, lang='en')))
-    for inter_exch in xml_root.findall(tag, namespaces):
-        inter_exch_id = inter_exch.attrib['id']
-        crid = inter_exch_id+database_version
-        graph.add((ECO[crid], RDF.type, ECO.interm_exch_Id))
-        graph.add((ECO[inter_exch_id], RDF.type, ECO.interm_exch_name))
-        # Define the property relation between the symbols of the CRID
-        graph.add((ECO[crid], BFO.has_part, ECO[database_id]))
-        graph.add((ECO[database_id], BFO.part_of, ECO[crid]))
-        graph.add((ECO[crid], BFO.has_part, ECO[inter_exch_id]))
-        graph.add((ECO[inter_exch_id], BFO.part_of, ECO[crid]))
-        # Define the labels with the different languages
-        xml_ns = namespaces['xml']
-        # t_prod as 'type product'
-        product_id = inter_exch_id+'t_prod'
-        graph.add((ECO[inter_exch_id], IAO.denotes, ECO[product_id]))
-        for name in inter_exch.findall('eco:name', namespaces):
-            lang = name.attrib['{'+xml_ns+'}lang']
-            inter_exch_label = name.text
-            crid_label = f'{database_label}:{inter_exch_label}'
-            graph.add((ECO[crid], RDFS.label, Literal(crid_label, lang=lang)))
-            graph.add((ECO[inter_exch_id],
-                       RDFS.label,
-                       Literal(inter_exch_label, lang=lang)))
-            graph.add((ECO[product_id], RDFS.label,
-                       Literal(inter_exch_label, lang=lang)))
-        # Detect if the product is a good (and not a service)
-        # Only goods have property
-        # But all goods don't have property
-        if inter_exch.find('eco:property', namespaces) is not None:
-            # Create the types
-            graph.add((ECO[product_id], RDF.type, MATERIAL_ENTITY))
-        elif inter_exch.find('eco:unitName', namespaces).text\
-          in ecoinvent_units['good']:
-            graph.add((ECO[product_id], RDF.type, MATERIAL_ENTITY))
-        elif inter_exch.find('eco:unitName', namespaces).text\
-          in ecoinvent_units['service']:
-            graph.add((ECO[product_id], RDF.type, SERVICE))
-        else:
-            graph.add((ECO[product_id], RDF.type, IEO.to_sort))
-    return graph
-        # TODO: get the quality (property) and link them to the good
-
-
-@define_registry
-def elem2graph(graph: Graph, xml_root: Xml,
-               registry: dict, namespaces: dict, tag: str) -> Graph:
-    """ Transform elementaryExchange into RDF graph.
-
-    The function transforms the ElementaryExchange MasterData into identifier.
-    The output is a RDF graph representing a part of the Ecoinvent nomenclature
-    structured with the IEO ontology. The output represents the centrally
-    registrered identifier (CRID) by the database version and the elementary
-    name identifier, e.g. ecoinvent3.0:f9749677-9c9f-4678-ab55-c607dfdc2cb9 for
-    the Carbon dioxide, fossil.
-    TODO: link the elementary exchange nomenclature to the material substance
-    and its property. In reality, the elementary exchange name denotes a
-    substance that has some quality (properties). It's wrong to link direclty
-    the nomenclature to the property.
+    registry_uri = context.crid_reg_uri
+    db_uri = context.db_uri
+    return [(registry_uri, RDF.type, LCA_REGISTRY),
+            (registry_uri, RDFS.label,
+             Literal(context.crid_reg_label, lang='en')),
+            (db_uri, RDF.type, REGISTRY_VERSION),
+            (db_uri, RDFS.label, Literal(context.version_label)),
+            (db_uri, IAO.denotes, registry_uri)]
+
+
+def name_labels(paths: dict, element: etree._Element) -> Iterator:
+    """ Iterate over the (language, label) of the names of the element."""
+    for name in element.iterfind(paths['name']):
+        yield name.attrib[LANG_KEY], name.text
+
+
+def compartment_labels(paths: dict, elem_exch: etree._Element) -> Iterator:
+    """ Iterate over the (language, label) of the names of the elementary
+    exchange completed by its compartment and subcompartment. The names
+    without compartment and subcompartment in their language are skipped."""
+    # Index the compartments by language once for all the names
+    compartments = {compartment.attrib[LANG_KEY]: compartment.text
+                    for compartment in elem_exch.iterfind(paths['compartment'])}
+    subcompartments = {subcompartment.attrib[LANG_KEY]: subcompartment.text
+                       for subcompartment
+                       in elem_exch.iterfind(paths['subcompartment'])}
+    for name in elem_exch.iterfind(paths['name']):
+        lang = name.attrib[LANG_KEY]
+        compartment_label = compartments.get(lang)
+        subcompartment_label = subcompartments.get(lang)
+        if compartment_label is not None and subcompartment_label is not None:
+            yield lang, f"{name.text}, in {compartment_label}, {subcompartment_label}"
+
+
+def product_type(paths: dict, exchange: etree._Element, unit_types: dict):
+    """ Return the type of the product denoted by the exchange: a good
+    (material entity), a service or a product to sort."""
+    # Detect if the product is a good (and not a service)
+    # Only goods have property
+    # But all goods don't have property
+    if exchange.find(paths['property']) is not None:
+        return MATERIAL_ENTITY
+    unit_name = exchange.find(paths['unit_name'])
+    if unit_name is None:
+        return TO_SORT
+    return unit_types.get(unit_name.text, TO_SORT)
+
+
+def element2triples(context: RegistryContext, element: etree._Element,
+                    crid_type: URIRef, name_type: URIRef,
+                    labels=name_labels, unit_types: dict = None) -> list:
+    """ Transform a MasterData element into RDF triples.
+
+    The element is identified by a CRID made of the database version and the
+    element identifier. The triples are common to all the nomenclatures;
+    the exchanges also denote a product whose type is detected.
     Variables:
-    - graph: the graph to update
-    - xml_root: the root of the xml file
-    - registry: dictionary containing the reference/info of the data registry
-    - tag: string containing the namespace tag
-    - namespaces: dictionary containing the namespaces with tags
+    - context: the values shared by the file, see registry_context
+    - element: the element to transform
+    - crid_type, name_type: the classes of the CRID and of the name
+    - labels: function iterating over the (language, label) of the element
+    - unit_types: None for the activities which denote no product, otherwise
+      the type of the product by unit, e.g. UNIT_TYPES
     """
-    crid_reg = registry['reg_id']
-    crid_reg_label = registry['label']
-    # Database identifier, e.g. EcoInvent3.1
-    major_release = xml_root.attrib['majorRelease']
-    minor_release = xml_root.attrib['minorRelease']
-    database_version = f'v{major_release}_{minor_release}'
-    database_label = f'{crid_reg_label}{major_release}.{minor_release}'
-    database_id = crid_reg+database_version
-    graph.add((ECO[crid_reg], RDFS.label, Literal(crid_reg_label, lang='en')))
-    graph.add((ECO.elementary_exchange_id, RDFS.subClassOf, PROD_CRID))
-    elem_exch_id_label = 'EcoInvent elementary exchange identifier'
-    graph.add((ECO.elementary_exchange_id, RDFS.label, Literal(elem_exch_id_label, lang='en')))
-    graph.add((ECO.elem_exch_name, RDFS.subClassOf, REF_PRODUCT))
-    elem_exch_label = 'EcoInvent elementary exchange label'
-    graph.add((ECO.elem_exch_name, RDFS.label, Literal(elem_exch_label, lang='en')))
-    for elem_exch in xml_root.findall(tag, namespaces):
-        elem_exch_id = elem_exch.attrib['id']
-        crid = elem_exch_id+database_version
-        graph.add((ECO[crid], RDF.type, ECO.elementary_exchange_id))
-        graph.add((ECO[elem_exch_id], RDF.type, ECO.elem_exch_name))
-        # Define the property relation between the symbols of the CRID
-        graph.add((ECO[crid], BFO.has_part, ECO[database_id]))
-        graph.add((ECO[database_id], BFO.part_of, ECO[crid]))
-        graph.add((ECO[crid], BFO.has_part, ECO[elem_exch_id]))
-        graph.add((ECO[elem_exch_id], BFO.part_of, ECO[crid]))
-        # Define the labels with the different languages
-        xml_ns = namespaces['xml']
-        product_id = elem_exch_id+'t_prod'
-        graph.add((ECO[elem_exch_id], IAO.denotes, ECO[product_id]))
-        graph.add((IEO.to_sort, RDFS.label, Literal('product to sort', lang='en')))
-        to_sort_comment = """Some product cannot be automatically defined as a good (material entity) or a service by the masterdata2rdf.py script. In this case, the product is defined as a product to sort. It's a temporary class that should not existed. Once the instance of this class are sorted, the product to sort class should be suppressed.
-        """
-        graph.add((IEO.to_sort, RDFS.comment, Literal(to_sort_comment, lang='en')))
-        for name in elem_exch.findall('eco:name', namespaces):
-            lang = name.attrib['{'+xml_ns+'}lang']
-            compartment = "eco:compartment/eco:compartment[@xml:lang='"+lang+"']"
-            subcompartment = "eco:compartment/eco:subcompartment[@xml:lang='"+lang+"']"
-            compartment_label = elem_exch.find(compartment, namespaces)
-            subcompartment_label = elem_exch.find(subcompartment, namespaces)
-            if (compartment_label and subcompartment_label) is not None:
-                elem_exch_label = f"{name.text}, in {compartment_label.text}, {subcompartment_label.text}"
-                crid_label = f'{database_label}:{elem_exch_label}'
-                graph.add((ECO[crid], RDFS.label, Literal(crid_label, lang=lang)))
-                graph.add((ECO[elem_exch_id],
-                           RDFS.label,
-                           Literal(elem_exch_label, lang=lang)))
-                graph.add((ECO[product_id], RDFS.label,
-                           Literal(elem_exch_label, lang=lang)))
-        if elem_exch.find('eco:property', namespaces) is not None:
-            # Create the types
-            graph.add((ECO[product_id], RDF.type, MATERIAL_ENTITY))
-        elif elem_exch.find('eco:unitName', namespaces).text\
-          in ecoinvent_units['good']:
-            graph.add((ECO[product_id], RDF.type, MATERIAL_ENTITY))
-        else:
-            graph.add((ECO[product_id], RDF.type, IEO.to_sort))
-    return graph
+    db_uri = context.db_uri
+    paths = context.paths
+    element_id = element.attrib['id']
+    crid_uri = URIRef(f'{ECO_STR}{element_id}{context.database_version}')
+    element_uri = URIRef(ECO_STR+element_id)
+    triples = [(crid_uri, RDF_TYPE, crid_type),
+               (element_uri, RDF_TYPE, name_type),
+               # Define the property relation between the symbols of the CRID
+               (crid_uri, HAS_PART, db_uri),
+               (crid_uri, HAS_PART, element_uri)]
+    if unit_types is None:
+        product_uri = None
+    else:
+        # t_prod as 'type product'
+        product_uri = URIRef(f'{ECO_STR}{element_id}t_prod')
+        triples.append((element_uri, DENOTES, product_uri))
+        triples.append((product_uri, RDF_TYPE,
+                        product_type(paths, element, unit_types)))
+    # Define the labels with the different languages
+    crid_label_prefix = context.crid_label_prefix
+    for lang, label in labels(paths, element):
+        triples.append((crid_uri, RDFS_LABEL,
+                        Literal(crid_label_prefix+label, lang=lang)))
+        name_literal = lang_literal(label, lang)
+        triples.append((element_uri, RDFS_LABEL, name_literal))
+        if product_uri is not None:
+            triples.append((product_uri, RDFS_LABEL, name_literal))
+    return triples
 
 
-def xml2graph(path: str) -> Graph:
-    """ Tranform the xml into a rdfgraph. The input is an MasterData file and
-    the output is a RDF graph. It detects the content of the masterData
-    (activity, intermediary exchange, elementary exchange...) and applies it
-    the proper function."""
-    graph = nom_graph()
-    tree = Xml.parse(path)
-    root = tree.getroot()
-    # define the dictionary of function
-    masterDataTransf = {'eco:activityName': act2graph,
-                        'eco:intermediateExchange': inter2graph,
-                        'eco:elementaryExchange': elem2graph,
-                        }
-    # get the namespace
-    file_namespace = root.tag.split('}')[0].strip('{')
+# The nomenclatures, by MasterData tag: the classes of the nomenclature and
+# the options of element2triples for each of its elements. Examples of CRID:
+# - activityName: ecoinvent3.0:88d6c0aa-0053-4367-b0be-05e4b49ff3c5 for the
+#   copper production, primary
+# - intermediateExchange: ecoinvent3.0:fbb039f7-f9cc-46d2-b631-313ddb125c1a
+#   for the copper
+# - elementaryExchange: ecoinvent3.0:f9749677-9c9f-4678-ab55-c607dfdc2cb9 for
+#   the Carbon dioxide, fossil
+# TODO: link the exchange nomenclatures to the material products and
+# substances and their properties. In reality, the exchange name denotes a
+# product that has some quality (properties). It's wrong to link direclty
+# the nomenclature to the property.
+NOMENCLATURES = {
+    'activityName': (ACT_CLASSES,
+                     {'crid_type': ACT_ID, 'name_type': ACT_NAME}),
+    'intermediateExchange': (INTER_CLASSES,
+                             {'crid_type': INTER_ID, 'name_type': INTER_NAME,
+                              'unit_types': UNIT_TYPES}),
+    'elementaryExchange': (ELEM_CLASSES,
+                           {'crid_type': ELEM_ID, 'name_type': ELEM_NAME,
+                            'labels': compartment_labels,
+                            'unit_types': GOOD_UNIT_TYPES})}
+
+
+def read_root(path: str) -> etree._Element:
+    """ Return the root element of the xml file with its attributes. Only
+    the start tag of the root is read."""
+    with open(path, 'rb') as xml_file:
+        for _, root in etree.iterparse(xml_file, events=('start',)):
+            return root
+
+
+def iter_elements(path: str, tags: Iterable) -> Iterator:
+    """ Iterate over the elements of the xml file with one of the given tags
+    (Clark notation). The file is read in a single pass and each element is
+    freed once it has been processed, so the memory stays flat whatever the
+    size of the file."""
+    for _, elem in etree.iterparse(path, events=('end',), tag=list(tags)):
+        yield elem
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def file_registry(file_namespace: str, registry_override: dict = None,
+                  on_missing: str = 'raise') -> dict:
+    """ Return the registry of the data from the namespace of the file.
+    When the namespace is unknown, the registry_override is used if given,
+    otherwise the registry is asked to the user (on_missing='ask') or a
+    RegistryUnknownError is raised (on_missing='raise')."""
+    if registry_override is not None:
+        return registry_override
     # verify the namespace is known, otherwise provide them
     if file_namespace in registries:
-        registry = registries[file_namespace]
-    else:
-        print("""\
-        The namespace of the file and the registry of the data are unknown.
-        Please update the masterdata2rdf.py file and abort the execution with
-        ctrl-c, or provide them: """)
-        registry['reg_id'] = input('What is the ID of the registry? ').lower()
-        registry['label'] = input('What is the registry label?')
+        return registries[file_namespace]
+    if on_missing != 'ask':
+        raise RegistryUnknownError(
+            f'The registry of the namespace {file_namespace} is unknown.')
+    print("""\
+    The namespace of the file and the registry of the data are unknown.
+    Please update the masterdata2rdf.py file and abort the execution with
+    ctrl-c, or provide them: """)
+    return {'reg_id': input('What is the ID of the registry? ').lower(),
+            'label': input('What is the registry label?')}
+
+
+def elements2triples(path: str, context: RegistryContext) -> Iterator:
+    """ Iterate over the triples of the MasterData elements of the file. It
+    detects the content of the masterData (activity, intermediary exchange,
+    elementary exchange...) and applies it the options of its nomenclature,
+    see NOMENCLATURES."""
+    # route each element to its nomenclature with its tag (ActivityName,
+    # ElementaryExchange, IntermediaryExchange, etc.) in a single pass
+    eco_ns = context.namespaces['eco']
+    handlers = {'{'+eco_ns+'}'+tag: nomenclature
+                for tag, nomenclature in NOMENCLATURES.items()}
+    for elem in iter_elements(path, handlers):
+        classes, options = handlers[elem.tag]
+        if classes is not None:
+            print(f"The file contains {elem.tag.split('}')[1]} nomenclature data")
+            yield from classes
+            # the classes are defined once per nomenclature
+            handlers[elem.tag] = (None, options)
+        yield from element2triples(context, elem, **options)
+
+
+def xml2triples(path: str, registry_override: dict = None,
+                on_missing: str = 'raise') -> Iterator:
+    """ Tranform the xml into RDF triples. The input is an MasterData file and
+    the output is an iterator over the triples of its nomenclature. The
+    registry is resolved before any triple is produced, see file_registry."""
+    root = read_root(path)
+    # get the namespace
+    file_namespace = root.tag.split('}')[0].strip('{')
+    registry = file_registry(file_namespace, registry_override, on_missing)
     ns = {'eco': file_namespace,
-          'xml': 'http://www.w3.org/XML/1998/namespace'}
-    # detect what MasterData file it is with the tags (ActivityName,
-    # ElementaryExchange, IntermediaryExchange, etc.) and apply the proper
-    # functions.
-    for tag in masterDataTransf.keys():
-        if root.find(tag, ns):
-            print(f"The file contains {tag.split(':')[1]} nomenclature data")
-            # call the proper function in function of the tag
-            graph = masterDataTransf[tag](graph=graph, xml_root=root,
-                                          registry=registry, namespaces=ns,
-                                          tag=tag)
+          'xml': XML_NS}
+    context = registry_context(root, registry, ns)
+    return chain(registry_triples(context), elements2triples(path, context))
+
+
+def xml2graph(path: str, registry_override: dict = None,
+              on_missing: str = 'raise') -> Graph:
+    """ Tranform the xml into a rdfgraph. The input is an MasterData file and
+    the output is a RDF graph."""
+    triples = xml2triples(path, registry_override, on_missing)
+    graph = ensure_schema(nom_graph())
+    graph.addN((s, p, o, graph) for s, p, o in triples)
     return graph
 
 
-def avoid_overwrite(output_path: str) -> str:
+def nt_term(term) -> str:
+    """ Return the N-Triples form of a term. Unlike Literal.n3, the literals
+    are always written on a single line."""
+    if isinstance(term, Literal):
+        text = '"'+str(term).translate(NT_ESCAPE_TABLE)+'"'
+        if term.language:
+            return f'{text}@{term.language}'
+        if term.datatype:
+            return f'{text}^^<{term.datatype}>'
+        return text
+    return term.n3()
+
+
+def xml2nt_stream(path: str, out_path: str, registry_override: dict = None,
+                  on_missing: str = 'raise'):
+    """ Write the nomenclature of the MasterData file directly as N-Triples.
+
+    It produces the same triples as xml2graph but writes them into the output
+    file while the xml is read, without building an in-memory graph."""
+    triples = xml2triples(path, registry_override, on_missing)
+    with open(out_path, 'wb', buffering=1 << 20) as out:
+        for s, p, o in chain(NOM_TEMPLATE, SCHEMA_TRIPLES, triples):
+            out.write(f'{nt_term(s)} {nt_term(p)} {nt_term(o)} .\n'
+                      .encode('utf-8'))
+
+
+def avoid_overwrite(output_path: str, interactive: bool = None) -> str:
     """ The function prevents the overwriting of the source file by the
-    output."""
+    output. Without a terminal to ask the user, e.g. in a batch pipeline,
+    the output is written next to the input with a numbered suffix."""
+    if interactive is None:
+        interactive = sys.stdin.isatty()
+    if not interactive:
+        name_file, ext = splitext(output_path)
+        suffix = 1
+        while exists(f'{name_file}_{suffix}{ext}'):
+            suffix += 1
+        new_path = f'{name_file}_{suffix}{ext}'
+        print(f'The input file is kept, the output is written to {new_path}')
+        return new_path
     message = """" The path for the output and the input file is the same.
     The input file is going to be overwritten. Are you sure to overwrite
     the input file? (Yes/No): """
-    answer = input(message).lower()
-    if answer in ['yes', 'y']:
-        return output_path
-    elif answer in ('no', 'n'):
-        message = " What is the new path? (absolute or relative path): "
-        new_path = input(message)
-        return new_path
-    else:
+    while True:
+        answer = input(message).lower()
+        if answer in ['yes', 'y']:
+            return output_path
+        elif answer in ('no', 'n'):
+            message = " What is the new path? (absolute or relative path): "
+            new_path = input(message)
+            return new_path
         print('Error. The expected answer is Yes or No.')
-        return avoid_overwrite(output_path)
+
+
+def default_output(input_path: str, output_format: str) -> str:
+    """ Return the default output path: the input path with the extension of
+    the format."""
+    name_file = splitext(abspath(input_path))[0]
+    new_ext = {'json-ld': '.json', 'xml': '.rdf', 'pretty-xml': '.rdf',
+               'n3': '.n3', 'nt': '.nt'}
+    return name_file+new_ext[output_format]
+
+
+def convert(input_path: str, output_path: str, output_format: str,
+            on_missing: str = 'raise') -> str:
+    """ Transform a MasterData file and write it in the given format. The
+    nt and n3 outputs are streamed as N-Triples (a subset of N3), the other
+    formats need the complete graph."""
+    if output_format in ('nt', 'n3'):
+        xml2nt_stream(input_path, output_path, on_missing=on_missing)
+    else:
+        graph = xml2graph(input_path, on_missing=on_missing)
+        graph.serialize(destination=output_path, format=output_format,
+                        encoding='utf-8')
+    return output_path
 
 
 def main():
@@ -363,15 +471,19 @@ def main():
     -----
 
     Command in shell:
-    $ python3 masterdata2rdf.py [OPTION] file1.xml
+    $ python3 masterdata2rdf.py [OPTION] file1.xml [output]
+    $ python3 masterdata2rdf.py [OPTION] --batch file1.xml file2.xml ...
 
     Arguments:
     file1.xml: the Ecoinvent's MasterData file to transforme. It has to
     respect the Ecospold2 format for MasterData.
+    output: path of the output file
 
     Options:
-    -output, -o path of the output file
-    --format, -f format of the output"""
+    --format, -f format of the output
+    --batch, -b transform several files in parallel
+    --yes, -y overwrite the input file without asking
+    --strict fail instead of asking for an unknown registry"""
     # create the parser
     parser = argparse.ArgumentParser(
         description=description,
@@ -379,37 +491,65 @@ def main():
     parser.add_argument(
         "--format", '-f',
         nargs=1,
-        choices=['json-ld', 'xml', 'n3', 'nt'],
+        choices=['json-ld', 'xml', 'pretty-xml', 'n3', 'nt'],
         default=['xml'],
         help='the output format of the file (default: Xml)')
+    parser.add_argument(
+        "--yes", '-y',
+        action='store_true',
+        help='overwrite the input file without asking')
+    parser.add_argument(
+        "--strict",
+        action='store_true',
+        help='fail instead of asking for an unknown registry')
+    parser.add_argument(
+        "--batch", '-b',
+        action='store_true',
+        help='transform every path as an input file, in parallel')
     parser.add_argument(
         "input_path",
         metavar='path_to_input_file',
-        nargs=1,
-        type=str,
-        help="the Ecoinvent's MasterData file to transforme.")
-    parser.add_argument(
-        "output_path",
-        metavar='path_to_output_file',
-        nargs='?',
+        nargs='+',
         type=str,
-        default=False,
-        help="the path of the output (default: input_name.format)")
+        help="""the Ecoinvent's MasterData file to transforme, followed by
+        the path of the output (default: input_name.format). With --batch,
+        all the paths are MasterData files.""")
     args = parser.parse_args()
-    input_path = args.input_path[0]
-    graph = xml2graph(input_path)
-    if not args.output_path:
-        path = abspath(args.input_path[0])
-        name_file = splitext(path)[0]
-        new_ext = {'json-ld': '.json', 'xml': '.rdf', 'n3': '.n3',
-                   'nt': '.nt'}
-        new_ext = new_ext[args.format[0]]
-        output_path = name_file+new_ext
+    output_format = args.format[0]
+    if args.batch:
+        input_paths = args.input_path
+        output_paths = [default_output(path, output_format)
+                        for path in input_paths]
+    elif len(args.input_path) <= 2:
+        input_paths = args.input_path[:1]
+        output_paths = args.input_path[1:] or [
+            default_output(input_paths[0], output_format)]
     else:
-        output_path = args.output_path
-    if input_path == output_path:
-        output_path = avoid_overwrite(output_path)
-    graph.serialize(output_path, format=args.format[0])
+        parser.error('only one input file is expected, use --batch to '
+                     'transform several files')
+    for index, (input_path, output_path) in enumerate(zip(input_paths,
+                                                           output_paths)):
+        if abspath(input_path) == abspath(output_path) and not args.yes:
+            output_paths[index] = avoid_overwrite(output_path)
+    # only ask for the registry when a user can answer
+    if args.strict or args.batch or not sys.stdin.isatty():
+        on_missing = 'raise'
+    else:
+        on_missing = 'ask'
+    try:
+        if len(input_paths) == 1:
+            convert(input_paths[0], output_paths[0], output_format, on_missing)
+        else:
+            # the files are independent: one process per file
+            nb_workers = min(cpu_count() or 1, len(input_paths))
+            with ProcessPoolExecutor(max_workers=nb_workers) as pool:
+                for output_path in pool.map(convert, input_paths,
+                                            output_paths,
+                                            repeat(output_format),
+                                            repeat(on_missing)):
+                    print(f'{output_path} written')
+    except RegistryUnknownError as error:
+        parser.exit(1, f'{error}\n')
 
 
 if __name__ == "__main__":
@@ -1,27 +1,25 @@
 ecoinvent_units_w_id = {'service':
-                   [['m2*year', 'eb955b7c-7bed-401f-9c76-5db716ca3640'],
-                    ['m3*year', '481b9712-c417-44f1-bfba-38d58088173c'],
-                    ['kWh', '77ae64fa-7e74-4252-9c3b-889c1cd20bfc'],
-                    ['metric ton*km', '2f4daad7-5331-4f14-930c-d8bca924557d'],
-                    ['ha', '86bbe475-8a8f-44d8-914c-e398787e7121'],
-                    ['m*year', '8266bd67-ebd3-4d31-b972-eee3cf0da36f'],
-                    ['kg*day', '241450a3-3497-4648-8c68-e44d04f64ac7'],
-                    ['hour', 'e32b56ef-fa80-4487-9796-f3c1476c27b3'],
-                    ['l', '86b0e4a2-57e5-48b8-a43d-22c7f8490dca'],
-                    ['person*km', '0e6f38bc-51be-4382-802d-1f389a88e589'],
-                    ['km*year', '08bd0c61-0b9a-4280-bc25-3444d52c15bf']],
+                   {'m2*year': 'eb955b7c-7bed-401f-9c76-5db716ca3640',
+                    'm3*year': '481b9712-c417-44f1-bfba-38d58088173c',
+                    'kWh': '77ae64fa-7e74-4252-9c3b-889c1cd20bfc',
+                    'metric ton*km': '2f4daad7-5331-4f14-930c-d8bca924557d',
+                    'ha': '86bbe475-8a8f-44d8-914c-e398787e7121',
+                    'm*year': '8266bd67-ebd3-4d31-b972-eee3cf0da36f',
+                    'kg*day': '241450a3-3497-4648-8c68-e44d04f64ac7',
+                    'hour': 'e32b56ef-fa80-4487-9796-f3c1476c27b3',
+                    'l': '86b0e4a2-57e5-48b8-a43d-22c7f8490dca',
+                    'person*km': '0e6f38bc-51be-4382-802d-1f389a88e589',
+                    'km*year': '08bd0c61-0b9a-4280-bc25-3444d52c15bf'},
                    'good':
-                   [['m3', 'de5b3c87-0e35-4fb0-9765-4f3ba34c99e5'],
-                   ['unit', '5b972631-34e3-4db7-a615-f6931770a0cb'],
-                   ['km', 'ae252091-811b-461b-8e89-8f3075639eb1']],
+                   {'m3': 'de5b3c87-0e35-4fb0-9765-4f3ba34c99e5',
+                    'unit': '5b972631-34e3-4db7-a615-f6931770a0cb',
+                    'km': 'ae252091-811b-461b-8e89-8f3075639eb1'},
                    'not_determined':
-                   [['MJ', '980b811e-3905-4797-82a5-173f5568bc7e'],
-                    ['m2', '1017f68a-f818-4f9d-a34d-a31e7386f628'],
-                    ['kg', '487df68b-4994-4027-8fdc-a4dc298257b7'],
-                    ['m', 'f2aaa4ba-fb58-49a7-a552-e7f64366f379']]}
+                   {'MJ': '980b811e-3905-4797-82a5-173f5568bc7e',
+                    'm2': '1017f68a-f818-4f9d-a34d-a31e7386f628',
+                    'kg': '487df68b-4994-4027-8fdc-a4dc298257b7',
+                    'm': 'f2aaa4ba-fb58-49a7-a552-e7f64366f379'}}
 
-ecoinvent_units = {'service': ('ha', 'hour', 'kWh', 'km*year', 'kg*day',
-                               'm*year', 'm2*year', 'm3*year', 'metric ton*km',
-                               'l', 'person*km'),
-                   'good': ('m3', 'unit', 'km'),
-                   'not_determined': ('kg', 'm', 'm2', 'MJ')}
+# the unit names of each group, derived from the table above
+ecoinvent_units = {group: frozenset(units)
+                   for group, units in ecoinvent_units_w_id.items()}